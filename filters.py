@@ -0,0 +1,99 @@
+import re
+
+
+def _odd_range(value, adjust):
+    odd = float(value if value is not None else 0)
+    adjustment = float(adjust if adjust is not None else 0)
+    return odd - adjustment, odd + adjustment
+
+
+def build_filters(search, away, league, odd1, oddx, odd2, adjust, min_search_length=3):
+    """Capture the active filter as a plain dict (snapshot of the form fields)"""
+    filters = {"blocked": False, "team": None, "league": None, "ranges": []}
+
+    if search:
+        if len(search) >= min_search_length:
+            # Remove spaces and trim using strip()
+            filters["team"] = ('TEAM2' if away else 'TEAM1', search.strip())
+        elif len(search) > 0:
+            # Recherche trop courte : aucune ligne affichée
+            filters["blocked"] = True
+
+    if league and league != "All Leagues":
+        filters["league"] = league
+
+    # Filtres ODD 1 / ODD X / ODD 2
+    for column, value, enabled in (('ODD1', odd1, odd1 or adjust),
+                                   ('ODDX', oddx, oddx),
+                                   ('ODD2', odd2, odd2)):
+        if enabled:
+            try:
+                min_value, max_value = _odd_range(value, adjust)
+                filters["ranges"].append((column, min_value, max_value))
+            except ValueError:
+                pass
+
+    return filters
+
+
+def apply_filters(query, filters):
+    """Apply a filter snapshot to a Supabase query builder"""
+    if filters["team"]:
+        column, value = filters["team"]
+        query = query.ilike(column, f'{value}')
+    if filters["league"]:
+        query = query.eq('LEAGUE', filters["league"])
+    for column, min_value, max_value in filters["ranges"]:
+        query = query.gte(column, min_value).lte(column, max_value)
+    return query
+
+
+def _ilike_regex(pattern):
+    parts = []
+    for char in pattern:
+        if char == '%':
+            parts.append('.*')
+        elif char == '_':
+            parts.append('.')
+        else:
+            parts.append(re.escape(char))
+    return re.compile(''.join(parts), re.IGNORECASE | re.DOTALL)
+
+
+def row_matches(row, filters):
+    """Evaluate a filter snapshot locally, with the same semantics as the server query"""
+    if filters["blocked"]:
+        return False
+    if filters["team"]:
+        column, value = filters["team"]
+        if not _ilike_regex(value).fullmatch(str(row.get(column) or '')):
+            return False
+    if filters["league"] and row.get('LEAGUE') != filters["league"]:
+        return False
+    for column, min_value, max_value in filters["ranges"]:
+        try:
+            odd = float(row.get(column))
+        except (TypeError, ValueError):
+            # NULL côté serveur : la comparaison échoue
+            return False
+        if not min_value <= odd <= max_value:
+            return False
+    return True
+
+
+def row_counters(row):
+    """Contribution of one row to the 1/X/2/over/BTS counters"""
+    counters = dict.fromkeys(('1', 'X', '2', 'over', 'bts'), 0)
+    result = row.get('RESULT')
+    if result in ('1', 'X', '2'):
+        counters[result] = 1
+    try:
+        goal1 = int(row.get('GOAL1'))
+        goal2 = int(row.get('GOAL2'))
+    except (TypeError, ValueError):
+        return counters
+    if goal1 + goal2 > 2:
+        counters['over'] = 1
+    if goal1 > 0 and goal2 > 0:
+        counters['bts'] = 1
+    return counters
@@ -0,0 +1,440 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+from filters import row_matches, row_counters
+
+
+def normalize_event(payload):
+    """Ramener un évènement (Supabase realtime ou enregistré) à {type, record, old_record}"""
+    data = payload.get("data", payload) if isinstance(payload, dict) else {}
+    event_type = str(data.get("type") or data.get("eventType") or "").upper()
+    record = data.get("record") or data.get("new") or {}
+    old_record = data.get("old_record") or data.get("old") or {}
+    return {"type": event_type, "record": record, "old_record": old_record}
+
+
+class LocalPublisher:
+    """In-process change feed: publish() pushes an event to every subscriber"""
+
+    def __init__(self):
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def subscribe(self, callback):
+        with self.lock:
+            self.subscribers.append(callback)
+
+        def unsubscribe():
+            with self.lock:
+                if callback in self.subscribers:
+                    self.subscribers.remove(callback)
+        return unsubscribe
+
+    def publish(self, payload):
+        event = normalize_event(payload)
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Error in change feed subscriber: {e}")
+
+    def is_alive(self):
+        """True while the feed can still deliver events"""
+        return True
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class ReplayFeed(LocalPublisher):
+    """Replay a recorded change stream (one JSON event per line)"""
+
+    def __init__(self, path, speed=1.0):
+        super().__init__()
+        self.path = path
+        self.speed = speed
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def events(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def replay(self):
+        for payload in self.events():
+            if self.stopped.is_set():
+                break
+            # "delay" : secondes écoulées depuis l'évènement précédent
+            delay = payload.get("delay", 0) if isinstance(payload, dict) else 0
+            if delay and self.speed:
+                time.sleep(delay / self.speed)
+            self.publish(payload)
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.replay, daemon=True)
+        self.thread.start()
+
+    def is_alive(self):
+        return not self.stopped.is_set()
+
+    def stop(self):
+        self.stopped.set()
+
+
+class SupabaseRealtimeFeed(LocalPublisher):
+    """Subscribe to INSERT/UPDATE postgres changes on the match table"""
+
+    def __init__(self, url, key, table, schema="public"):
+        super().__init__()
+        self.url = url
+        self.key = key
+        self.table = table
+        self.schema = schema
+        self.stopped = threading.Event()
+        self.subscribed = threading.Event()
+        self.thread = None
+
+    def on_status(self, status, error=None):
+        # SUBSCRIBED, CHANNEL_ERROR, TIMED_OUT ou CLOSED
+        if getattr(status, "value", status) == "SUBSCRIBED":
+            self.subscribed.set()
+        else:
+            self.subscribed.clear()
+            if error:
+                print(f"Realtime subscription {getattr(status, 'value', status)}: {error}")
+
+    async def listen(self):
+        # Le client realtime de supabase-py est asynchrone
+        from supabase import acreate_client
+
+        client = await acreate_client(self.url, self.key)
+        channel = client.channel(f"{self.table}-changes")
+        channel.on_postgres_changes("INSERT", schema=self.schema, table=self.table, callback=self.publish)
+        channel.on_postgres_changes("UPDATE", schema=self.schema, table=self.table, callback=self.publish)
+        await channel.subscribe(self.on_status)
+        try:
+            while not self.stopped.is_set():
+                await asyncio.sleep(0.5)
+        finally:
+            await client.remove_channel(channel)
+
+    def run(self):
+        try:
+            asyncio.run(self.listen())
+        except Exception as e:
+            print(f"Error in realtime subscription: {e}")
+        finally:
+            self.subscribed.clear()
+
+    def is_alive(self):
+        return self.subscribed.is_set()
+
+    def start(self):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+
+def insert_into_pages(pages, row, page_size):
+    """Insert a row into the cached pages (ordered by ID desc), shifting overflow down.
+
+    Pages that can no longer be kept exact are dropped; returns False in that case.
+    """
+    row_id = row.get('ID')
+    carry = row
+    for index in sorted(pages):
+        if carry is None:
+            break
+        rows = pages[index]
+        previous_cached = index == 0 or index - 1 in pages
+        if carry is row:
+            if len(rows) >= page_size and row_id < rows[-1]['ID']:
+                continue  # La ligne appartient à une page suivante
+            if not previous_cached and rows and row_id > rows[0]['ID']:
+                # Une ligne inconnue glisse depuis la page précédente non chargée
+                drop_pages_from(pages, index)
+                return False
+            position = next((i for i, item in enumerate(rows) if item['ID'] < row_id), len(rows))
+            rows.insert(position, row)
+        else:
+            if not previous_cached:
+                drop_pages_from(pages, index)
+                return False
+            rows.insert(0, carry)
+        carry = rows.pop() if len(rows) > page_size else None
+    return True
+
+
+def drop_pages_from(pages, first_index):
+    for index in [index for index in pages if index >= first_index]:
+        del pages[index]
+
+
+def find_in_pages(pages, row_id):
+    for index, rows in pages.items():
+        for position, item in enumerate(rows):
+            if item.get('ID') == row_id:
+                return index, position
+    return None
+
+
+class FeedState:
+    """Total, leagues, cached pages and counters kept current by the change feed"""
+
+    COUNTERS = ('1', 'X', '2', 'over', 'bts')
+
+    def __init__(self, page_size):
+        self.page_size = page_size
+        self.lock = threading.RLock()
+        self.ready = False
+        self.filters = None
+        self.total_records = 0
+        self.filtered_records = 0
+        self.counts = dict.fromkeys(self.COUNTERS, 0)
+        self.leagues = set()
+        self.pages = {}
+        # Évènements reçus pendant un chargement, rejoués au reset
+        self.pending = []
+
+    def reset(self, filters, filtered_records, counts, page_index=0, rows=(), total_records=None, max_id=None):
+        """Repartir d'un état calculé par le serveur pour ce filtre.
+
+        rows is the page just loaded; other cached pages are kept when the
+        filter is unchanged. max_id is the highest ID the server queries
+        could see: buffered inserts up to it are already counted, later
+        ones are replayed. Returns the changes produced by the replayed events.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, []
+            pages = self.pages if filters == self.filters else {}
+            fresh = {page_index: list(rows)}
+
+            self.filters = filters
+            self.filtered_records = filtered_records
+            self.counts = dict(counts)
+            if total_records is not None:
+                self.total_records = total_records
+            self.ready = True
+
+            changes = set()
+            for event in pending:
+                record = event["record"]
+                record_id = record.get('ID')
+                if event["type"] == "INSERT" and max_id is not None and record_id is not None and record_id <= max_id:
+                    # Déjà dans les comptages du serveur : seuls le total et les ligues bougent
+                    changes.update(self.count_insert(record))
+                    if row_matches(record, filters) and find_in_pages(pages, record_id) is None:
+                        # Les anciennes pages en cache glissent comme celles du serveur
+                        insert_into_pages(pages, record, self.page_size)
+            pages.update(fresh)
+            self.pages = pages
+
+            for event in pending:
+                record_id = event["record"].get('ID')
+                if event["type"] == "INSERT" and max_id is not None and record_id is not None and record_id <= max_id:
+                    continue
+                elif event["type"] == "UPDATE" and find_in_pages(fresh, record_id) is None:
+                    # On ne sait pas si le serveur voyait déjà cette mise à jour
+                    changes.add("refresh")
+                else:
+                    changes.update(self.apply(event))
+            return changes
+
+    def invalidate(self):
+        """Mettre les évènements en attente jusqu'au prochain reset (chargement en cours)"""
+        with self.lock:
+            self.ready = False
+
+    def count_insert(self, record):
+        changes = {"total"}
+        self.total_records += 1
+        league = (record.get('LEAGUE') or '').strip()
+        if league and league not in self.leagues:
+            self.leagues.add(league)
+            changes.add("leagues")
+        return changes
+
+    def add_counts(self, row, sign):
+        for key, value in row_counters(row).items():
+            self.counts[key] += sign * value
+
+    def apply(self, event):
+        """Apply one normalized change event.
+
+        Returns the set of parts that changed: "total", "leagues", "stats",
+        "rows", or "refresh" when the state can no longer be kept exact.
+        """
+        changes = set()
+        record = event["record"]
+        if not record:
+            return changes
+        with self.lock:
+            if not self.ready:
+                self.pending.append(event)
+                return changes
+
+            location = find_in_pages(self.pages, record.get('ID'))
+            if event["type"] == "INSERT" and location is None:
+                changes.update(self.count_insert(record))
+                if row_matches(record, self.filters):
+                    self.filtered_records += 1
+                    self.add_counts(record, 1)
+                    changes.add("stats")
+                    if not insert_into_pages(self.pages, record, self.page_size):
+                        changes.add("refresh")
+                    changes.add("rows")
+                return changes
+
+            if event["type"] not in ("INSERT", "UPDATE"):
+                return changes
+
+            # Mise à jour : il faut l'ancienne ligne pour corriger les compteurs
+            old_record = None
+            if location is not None:
+                index, position = location
+                old_record = self.pages[index][position]
+            elif 'RESULT' in event["old_record"]:
+                # Disponible avec REPLICA IDENTITY FULL
+                old_record = event["old_record"]
+
+            matches = row_matches(record, self.filters)
+            if old_record is None:
+                # Impossible de savoir si l'ancienne ligne était comptée
+                changes.add("refresh")
+                return changes
+
+            was_matching = row_matches(old_record, self.filters)
+            if was_matching:
+                self.filtered_records -= 1
+                self.add_counts(old_record, -1)
+            if matches:
+                self.filtered_records += 1
+                self.add_counts(record, 1)
+            if was_matching or matches:
+                changes.add("stats")
+
+            if location is not None and matches:
+                index, position = location
+                self.pages[index][position] = record
+                changes.add("rows")
+            elif location is not None:
+                # La ligne sort du filtre : les pages suivantes remontent
+                drop_pages_from(self.pages, location[0])
+                changes.update(("rows", "refresh"))
+            elif matches and not was_matching:
+                if not insert_into_pages(self.pages, record, self.page_size):
+                    changes.add("refresh")
+                changes.add("rows")
+            return changes
+
+
+def replay_stream(path, filters, page_size):
+    """Replay a recorded stream from an empty state; returns (state, refreshes)"""
+    state = FeedState(page_size)
+    state.reset(filters, 0, dict.fromkeys(FeedState.COUNTERS, 0), total_records=0)
+    refreshes = []
+
+    def apply(event):
+        if "refresh" in state.apply(event):
+            refreshes.append(event["record"].get('ID'))
+
+    feed = ReplayFeed(path, speed=0)
+    feed.subscribe(apply)
+    feed.replay()
+    return state, refreshes
+
+
+def summarize(state, refreshes):
+    return {
+        "total": state.total_records,
+        "games": state.filtered_records,
+        "counts": dict(state.counts),
+        "leagues": sorted(state.leagues),
+        "page0": [row.get('ID') for row in state.pages.get(0, [])],
+        "refreshes": refreshes,
+    }
+
+
+def check(expected_path):
+    """Replay every case of an expected-results file; returns the list of mismatches"""
+    from filters import build_filters
+
+    with open(expected_path, encoding="utf-8") as f:
+        expected = json.load(f)
+    stream = os.path.join(os.path.dirname(expected_path), expected["stream"])
+    failures = []
+    for case in expected["cases"]:
+        options = case.get("filters", {})
+        filters = build_filters(
+            options.get("team", ""),
+            options.get("away", False),
+            options.get("league", "All Leagues"),
+            options.get("odd1", ""),
+            options.get("oddx", ""),
+            options.get("odd2", ""),
+            options.get("edge", "0.00"),
+        )
+        result = summarize(*replay_stream(stream, filters, case.get("page_size", 50)))
+        for key, value in case["expected"].items():
+            if result[key] != value:
+                failures.append(f"{case['name']}: {key} = {result[key]!r}, expected {value!r}")
+    return failures
+
+
+def main():
+    """Replay a recorded change stream: print the counters, or check them with --check"""
+    import argparse
+    from filters import build_filters
+
+    parser = argparse.ArgumentParser(description="Replay a recorded change stream")
+    parser.add_argument("stream", nargs="?", help="JSON lines file of INSERT/UPDATE events")
+    parser.add_argument("--check", help="expected-results file; exits 1 on any mismatch")
+    parser.add_argument("--team", default="")
+    parser.add_argument("--away", action="store_true")
+    parser.add_argument("--league", default="All Leagues")
+    parser.add_argument("--odd1", default="")
+    parser.add_argument("--oddx", default="")
+    parser.add_argument("--odd2", default="")
+    parser.add_argument("--edge", default="0.00")
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.check:
+        failures = check(args.check)
+        for failure in failures:
+            print(f"FAIL {failure}")
+        print("OK" if not failures else f"{len(failures)} mismatch(es)")
+        sys.exit(1 if failures else 0)
+    if not args.stream:
+        parser.error("a stream file or --check is required")
+
+    filters = build_filters(args.team, args.away, args.league, args.odd1,
+                            args.oddx, args.odd2, args.edge)
+    result = summarize(*replay_stream(args.stream, filters, args.page_size))
+    print(f"Total: {result['total']}")
+    print(f"Games: {result['games']}")
+    for key in FeedState.COUNTERS:
+        print(f"{key}: {result['counts'][key]}")
+    print(f"Leagues: {', '.join(result['leagues'])}")
+    print(f"Page 0: {result['page0']}")
+    print(f"Refresh requested by: {result['refreshes']}")
+
+
+if __name__ == '__main__':
+    main()
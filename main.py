@@ -1,22 +1,69 @@
 from supabase import create_client
 import flet as ft
 from pages.config import SUPABASE_CONFIG, TABLE_NAME, PAGE_SIZE
+from filters import build_filters, apply_filters
+from live_updates import FeedState, ReplayFeed, SupabaseRealtimeFeed
+from snapshot import Snapshot, SnapshotWriter, SnapshotError
+from prediction import PredictionService
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
 import time
+import sys
+import os
+import json
+from datetime import date
 
 class DataViewerApp:
+    # Statistique -> attribut affiché dans la carte des statistiques
+    STAT_ATTRIBUTES = {
+        '1': 'filtered_records_1',
+        'X': 'filtered_records_X',
+        '2': 'filtered_records_2',
+        'over': 'filtered_over',
+        'bts': 'filtered_bts',
+    }
+
     def __init__(self):
         self.init_supabase_client()
         self.page_size = PAGE_SIZE
         self.current_page = 0
         self.total_records = 0
         self.filtered_records = 0
+        self.filtered_records_1 = 0
+        self.filtered_records_X = 0
+        self.filtered_records_2 = 0
+        self.filtered_over = 0
+        self.filtered_bts = 0
         self.min_search_length = 3  # Minimum de caractères pour la recherche
         # Ajouter une variable pour gérer les délais
         self.debounce_timer = None
         self.max_retries = 3
         self.retry_delay = 1  # secondes
+        # Chargement progressif : une génération par changement de filtre ou de page
+        self.generation = 0
+        self.render_lock = threading.RLock()
+        # Flux de changements (mises à jour en direct)
+        self.feed = None
+        self.live = FeedState(self.page_size)
+        self.live_refresh_timer = None
+        self.live_refresh_delay = 2  # secondes
+        self.replay_path = None
+        # Historique local (fichier snapshot mappé en mémoire)
+        self.snapshot_path = None
+        self.history = None
+        self.snapshot_batch_size = 1000
+        self.default_snapshot_path = "history.snap"
+        self.snapshot_lock = threading.Lock()
+        # Matchs sans résultat plus anciens que cette fenêtre d'ID : considérés abandonnés
+        self.pending_window = 20000
+        self.snapshot_sync_interval = 600  # secondes entre deux synchronisations
+        # Onglet Prediction : tables de fréquences construites depuis l'historique
+        self.prediction_service = None
+        self.prediction_rows = 0
+        self.max_fixtures = 500
+        self.fixture_date_format = "%Y-%m-%d"  # format de la colonne DATE
+        self.scoring_lock = threading.Lock()
 
     def init_supabase_client(self):
         """Initialize Supabase client with retry mechanism"""
@@ -80,6 +127,113 @@ class DataViewerApp:
             print(f"Erreur lors du comptage total: {e}")
             return 0
 
+    def sync_snapshot(self, path, verify=True):
+        """Append the finished matches missing from the local snapshot, then map it in memory"""
+        # Un seul synchroniseur à la fois dans l'application
+        with self.snapshot_lock:
+            try:
+                writer = SnapshotWriter(path, verify=verify)
+            except SnapshotError as e:
+                # Fichier corrompu ou d'une autre version : reconstruction complète
+                print(f"Rebuilding snapshot {path}: {e}")
+                self.set_history(None)
+                writer = SnapshotWriter.create(path)
+                self.write_sync_watermark(path, 0)
+
+            # Les résultats arrivent après l'insertion, pas dans l'ordre des ID : le
+            # repère ne dépasse jamais un match encore sans résultat au dernier passage
+            watermark = self.read_sync_watermark(path)
+            with Snapshot(path) as history:
+                if not len(history):
+                    watermark = 0
+                last_id = history.max_id()
+                known_ids = {row_id for row_id in history.column('ID') if row_id > watermark}
+
+            try:
+                # Relevé avant la récupération : un match qui se termine entre-temps reste en attente
+                pending_id = self.lowest_pending_id(max(watermark, last_id - self.pending_window))
+            except Exception as e:
+                print(f"Error synchronizing snapshot: {e}")
+                return self.set_history(Snapshot(path))
+
+            start_id = watermark
+            complete = True
+            while True:
+                def query_func():
+                    # Seuls les matchs terminés entrent dans l'historique
+                    return (
+                        self.supabase.table(TABLE_NAME).select("*")
+                        .not_.is_('RESULT', 'null')
+                        .gt('ID', start_id)
+                        .order('ID')
+                        .range(0, self.snapshot_batch_size - 1)
+                        .execute()
+                    )
+                try:
+                    rows = self.execute_with_retry(query_func).data
+                    if not rows:
+                        break
+                    writer.append([row for row in rows if row['ID'] not in known_ids])
+                except Exception as e:
+                    print(f"Error synchronizing snapshot: {e}")
+                    complete = False
+                    break
+                start_id = rows[-1]['ID']
+                last_id = max(last_id, start_id)
+
+            if complete:
+                new_watermark = last_id if pending_id is None else min(last_id, pending_id - 1)
+                self.write_sync_watermark(path, max(watermark, new_watermark))
+
+            return self.set_history(Snapshot(path))
+
+    def run_snapshot_sync(self, path):
+        """Keep the local history current in the background"""
+        verify = True
+        while True:
+            try:
+                self.sync_snapshot(path, verify=verify)
+                # Sommes de contrôle vérifiées une fois au démarrage
+                verify = False
+            except Exception as e:
+                print(f"Error synchronizing snapshot: {e}")
+            time.sleep(self.snapshot_sync_interval)
+
+    def set_history(self, history):
+        """Swap the mapped history, closing the previous mapping (caller holds snapshot_lock)"""
+        if self.history is not None:
+            self.history.close()
+        self.history = history
+        return history
+
+    def read_sync_watermark(self, path):
+        """Highest ID below which every match is in the snapshot (0 if unknown)"""
+        try:
+            with open(f"{path}.sync", encoding="utf-8") as f:
+                return int(json.load(f)["watermark"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0
+
+    def write_sync_watermark(self, path, watermark):
+        tmp_path = f"{path}.sync.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"watermark": watermark}, f)
+        os.replace(tmp_path, f"{path}.sync")
+
+    def lowest_pending_id(self, above_id):
+        """Lowest ID above above_id whose result is still unknown, or None"""
+        def query_func():
+            return (
+                self.supabase.table(TABLE_NAME).select("ID")
+                .is_('RESULT', 'null')
+                .gt('ID', above_id)
+                .order('ID')
+                .range(0, 0)
+                .execute()
+            )
+        response = self.execute_with_retry(query_func)
+        return response.data[0]['ID'] if response.data else None
+
     def load_leagues(self):
         def query_func():
             return self.supabase.table(TABLE_NAME).select("LEAGUE").execute()
@@ -97,6 +251,7 @@ class DataViewerApp:
             if response.data:
                 # Extraire les noms de ligues uniques
                 all_leagues = list(set(item['LEAGUE'].strip() for item in response.data if item.get('LEAGUE')))
+                self.live.leagues = set(all_leagues)
                 
                 # Séparer les favoris des autres ligues
                 favorites = [league for league in favorite_leagues if league in all_leagues]
@@ -116,176 +271,76 @@ class DataViewerApp:
             print(f"Error retrieving leagues: {e}")
 
 
-    def get_filtered_data(self):
+    def current_filters(self):
+        return build_filters(
+            self.search_field.value,
+            self.away_toggle.value,
+            self.filter_dropdown.value,
+            self.odd1_field.value,
+            self.oddx_field.value,
+            self.odd2_field.value,
+            self.odd_adjust_field.value,
+            self.min_search_length,
+        )
+
+    def fetch_max_id(self):
+        """Highest ID in the table: every query of one load stops at this ID"""
+        def query_func():
+            return self.supabase.table(TABLE_NAME).select("ID").order('ID', desc=True).range(0, 0).execute()
+        response = self.execute_with_retry(query_func)
+        return response.data[0]['ID'] if response.data else 0
+
+    def fetch_page(self, filters, page_index, max_id):
+        """Return the rows of one page and the number of matching records"""
         # Construire la requête principale avec les filtres
         def query_func():
-            query = self.supabase.table(TABLE_NAME).select("*", count='exact')
-
-            if self.search_field.value:
-                if len(self.search_field.value) >= self.min_search_length:
-                    # Remove spaces and trim using strip()
-                    search_value = self.search_field.value.strip()
-                    # Vérifie l'état du bouton "Away"
-                    if self.away_toggle.value:  # Si le switch est activé (Away)
-                        query = query.ilike('TEAM2', f'{search_value}')
-                    else:  # Si le switch est désactivé
-                        query = query.ilike('TEAM1', f'{search_value}')
-                elif len(self.search_field.value) > 0:
-                    return []
-
-            if self.filter_dropdown.value and self.filter_dropdown.value != "All Leagues":
-                query = query.eq('LEAGUE', self.filter_dropdown.value)
-
-            # Filtres ODD 1
-            if self.odd1_field.value or self.odd_adjust_field.value:
-                try:
-                    odd1_value = float(self.odd1_field.value if self.odd1_field.value is not None else 0)
-                    adjustment_value = float(self.odd_adjust_field.value if self.odd_adjust_field.value is not None else 0)
-                    min_value = odd1_value - adjustment_value
-                    max_value = odd1_value + adjustment_value
-                    query = query.gte('ODD1', min_value).lte('ODD1', max_value)
-                except ValueError:
-                    pass
-
-            # Filtres ODD X
-            if self.oddx_field.value:
-                try:
-                    oddx_value = float(self.oddx_field.value) if self.oddx_field.value is not None else 0
-                    adjustment_value = float(self.odd_adjust_field.value) if self.odd_adjust_field.value is not None else 0
-                    min_value = oddx_value - adjustment_value
-                    max_value = oddx_value + adjustment_value
-                    query = query.gte('ODDX', min_value).lte('ODDX', max_value)
-                except ValueError:
-                    pass
-
-            # Filtres ODD 2
-            if self.odd2_field.value:
-                try:
-                    odd2_value = float(self.odd2_field.value) if self.odd2_field.value is not None else 0
-                    adjustment_value = float(self.odd_adjust_field.value) if self.odd_adjust_field.value is not None else 0
-                    min_value = odd2_value - adjustment_value
-                    max_value = odd2_value + adjustment_value
-                    query = query.gte('ODD2', min_value).lte('ODD2', max_value)
-                except ValueError:
-                    pass
+            query = apply_filters(self.supabase.table(TABLE_NAME).select("*", count='exact'), filters)
+            query = query.lte('ID', max_id)
 
             # Ajouter l'ordre décroissant par ID
             query = query.order('ID', desc=True)
             
             # Pagination
-            start = self.current_page * self.page_size
+            start = page_index * self.page_size
             query = query.range(start, start + self.page_size - 1)
 
             return query.execute()
-        try:
-            # Exécuter la requête principale
-            response = self.execute_with_retry(query_func)
-            self.filtered_records = response.count
-
-            # Construire une fonction pour réutiliser les filtres
-            def apply_filters(base_query):
-                if self.search_field.value:
-                    if len(self.search_field.value) >= self.min_search_length:
-                        # Remove spaces and trim using strip()
-                        search_value = self.search_field.value.strip()
-                        # Vérifie l'état du bouton "Away"
-                        if self.away_toggle.value:  # Si le switch est activé (Away)
-                            base_query = base_query.ilike('TEAM2', f'{search_value}')
-                        else:  # Si le switch est désactivé
-                            base_query = base_query.ilike('TEAM1', f'{search_value}')
-                    else:  # Si la valeur du champ est trop courte
-                        return base_query  # Return the original query instead of empty list
-                if self.filter_dropdown.value and self.filter_dropdown.value != "All Leagues":
-                    base_query = base_query.eq('LEAGUE', self.filter_dropdown.value)
-                if self.odd1_field.value or self.odd_adjust_field.value:
-                    try:
-                        odd1_value = float(self.odd1_field.value if self.odd1_field.value is not None else 0)
-                        adjustment_value = float(self.odd_adjust_field.value if self.odd_adjust_field.value is not None else 0)
-                        min_value = odd1_value - adjustment_value
-                        max_value = odd1_value + adjustment_value
-                        base_query = base_query.gte('ODD1', min_value).lte('ODD1', max_value)
-                    except ValueError:
-                        pass
-                if self.oddx_field.value:
-                    try:
-                        oddx_value = float(self.oddx_field.value) if self.oddx_field.value is not None else 0
-                        adjustment_value = float(self.odd_adjust_field.value) if self.odd_adjust_field.value is not None else 0
-                        min_value = oddx_value - adjustment_value
-                        max_value = oddx_value + adjustment_value
-                        base_query = base_query.gte('ODDX', min_value).lte('ODDX', max_value)
-                    except ValueError:
-                        pass
-                if self.odd2_field.value:
-                    try:
-                        odd2_value = float(self.odd2_field.value) if self.odd2_field.value is not None else 0
-                        adjustment_value = float(self.odd_adjust_field.value) if self.odd_adjust_field.value is not None else 0
-                        min_value = odd2_value - adjustment_value
-                        max_value = odd2_value + adjustment_value
-                        base_query = base_query.gte('ODD2', min_value).lte('ODD2', max_value)
-                    except ValueError:
-                        pass
-                return base_query
+        response = self.execute_with_retry(query_func)
+        return response.data, response.count
 
+    def count_filtered(self, stat, filters, max_id):
+        """Count the matching records for one statistic ("1", "X", "2", "over", "bts")"""
+        def query_func():
+            query = self.supabase.table(TABLE_NAME).select("*", count='exact').lte('ID', max_id)
             # Comptage des résultats "1", "X", "2"
-            def count_result_1():
-                return apply_filters(
-                    self.supabase.table(TABLE_NAME).select("*", count='exact').eq('RESULT', '1')
-                ).execute()
-
-            def count_result_X():
-                return apply_filters(
-                    self.supabase.table(TABLE_NAME).select("*", count='exact').eq('RESULT', 'X')
-                ).execute()
-
-            def count_result_2():
-                return apply_filters(
-                    self.supabase.table(TABLE_NAME).select("*", count='exact').eq('RESULT', '2')
-                ).execute()
-
-            def count_over():
-                return apply_filters(
-                    self.supabase.table(TABLE_NAME).select("*", count='exact')
-                    .gt('GOAL1 + GOAL2', 2)
-                ).execute()
-
-            def count_bts():
-                return apply_filters(
-                    self.supabase.table(TABLE_NAME).select("*", count='exact')
-                    .gt('GOAL1', 0)
-                    .gt('GOAL2', 0)
-                ).execute()
-
-            # Execute all counts with retry mechanism
-            result_1 = self.execute_with_retry(count_result_1)
-            result_X = self.execute_with_retry(count_result_X)
-            result_2 = self.execute_with_retry(count_result_2)
-            result_over = self.execute_with_retry(count_over)
-            result_bts = self.execute_with_retry(count_bts)
-
-            self.filtered_records_1 = result_1.count
-            self.filtered_records_X = result_X.count
-            self.filtered_records_2 = result_2.count
-            self.filtered_over = result_over.count
-            self.filtered_bts = result_bts.count
-
-            # Retourner les données filtrées
-            return response.data
-
-        except Exception as e:
-            print(f"Erreur lors de la récupération des données: {e}")
-            return []
+            if stat in ('1', 'X', '2'):
+                query = query.eq('RESULT', stat)
+            elif stat == 'over':
+                query = query.gt('GOAL1 + GOAL2', 2)
+            elif stat == 'bts':
+                query = query.gt('GOAL1', 0).gt('GOAL2', 0)
+            return apply_filters(query, filters).execute()
+        return self.execute_with_retry(query_func).count
 
     def calculate_percentage(self, part, total):
         return (part / total * 100) if total > 0 else 0
 
+    def stat_skeleton(self):
+        # Emplacement grisé affiché en attendant le résultat du comptage
+        return ft.Container(width=80, height=14, bgcolor=ft.colors.BLACK12, border_radius=4)
+
     def update_stats_card(self):
         total = f"{self.total_records:,}".replace(',', ' ')
         filtered = f"Games: {self.filtered_records:,}".replace(',', ' ')
-        filtered_1 = f"{self.filtered_records_1:,}".replace(',', ' ')
-        filtered_X = f"{self.filtered_records_X:,}".replace(',', ' ')
-        filtered_2 = f"{self.filtered_records_2:,}".replace(',', ' ')
-        filtered_over = f"{self.filtered_over:,}".replace(',', ' ')
-        filtered_bts = f"{self.filtered_bts:,}".replace(',', ' ')
+        # None : statistique encore en cours de chargement
+        def count_text(count):
+            return f"{count:,}".replace(',', ' ') if count is not None else None
+
+        filtered_1 = count_text(self.filtered_records_1)
+        filtered_X = count_text(self.filtered_records_X)
+        filtered_2 = count_text(self.filtered_records_2)
+        filtered_over = count_text(self.filtered_over)
+        filtered_bts = count_text(self.filtered_bts)
 
         # Définir les autres en-têtes du tableau
         headers = [ft.Text(filtered, size=20, weight=ft.FontWeight.BOLD, text_align=ft.TextAlign.CENTER),
@@ -304,11 +359,11 @@ class DataViewerApp:
 
         rows = [
             ["ODDS 1X2", 
-            f"{filtered_1} ({self.calculate_percentage(safe_float(self.filtered_records_1), safe_float(self.filtered_records)):.1f}%) ({self.calculate_percentage(safe_float(self.filtered_records_1) * safe_float(self.odd1_field.value), (safe_float(self.filtered_records) * safe_float(self.odd1_field.value) * safe_float(self.oddx_field.value)* safe_float(self.odd2_field.value))/10):.1f}%)",
-            f"{filtered_X} ({self.calculate_percentage(safe_float(self.filtered_records_X), safe_float(self.filtered_records)):.1f}%) ({self.calculate_percentage(safe_float(self.filtered_records_X) * safe_float(self.oddx_field.value), (safe_float(self.filtered_records) * safe_float(self.odd1_field.value) * safe_float(self.oddx_field.value)* safe_float(self.odd2_field.value))/10):.1f}%)", 
-            f"{filtered_2} ({self.calculate_percentage(safe_float(self.filtered_records_2), safe_float(self.filtered_records)):.1f}%) ({self.calculate_percentage(safe_float(self.filtered_records_2) * safe_float(self.odd2_field.value), (safe_float(self.filtered_records) * safe_float(self.odd1_field.value) * safe_float(self.oddx_field.value)* safe_float(self.odd2_field.value))/10):.1f}%)", 
-            f"{filtered_over} ({self.calculate_percentage(safe_float(self.filtered_over), safe_float(self.filtered_records)):.1f}%)", 
-            f"{filtered_bts} ({self.calculate_percentage(safe_float(self.filtered_bts), safe_float(self.filtered_records)):.1f}%)"],
+            f"{filtered_1} ({self.calculate_percentage(safe_float(self.filtered_records_1), safe_float(self.filtered_records)):.1f}%) ({self.calculate_percentage(safe_float(self.filtered_records_1) * safe_float(self.odd1_field.value), (safe_float(self.filtered_records) * safe_float(self.odd1_field.value) * safe_float(self.oddx_field.value)* safe_float(self.odd2_field.value))/10):.1f}%)" if filtered_1 is not None else None,
+            f"{filtered_X} ({self.calculate_percentage(safe_float(self.filtered_records_X), safe_float(self.filtered_records)):.1f}%) ({self.calculate_percentage(safe_float(self.filtered_records_X) * safe_float(self.oddx_field.value), (safe_float(self.filtered_records) * safe_float(self.odd1_field.value) * safe_float(self.oddx_field.value)* safe_float(self.odd2_field.value))/10):.1f}%)" if filtered_X is not None else None,
+            f"{filtered_2} ({self.calculate_percentage(safe_float(self.filtered_records_2), safe_float(self.filtered_records)):.1f}%) ({self.calculate_percentage(safe_float(self.filtered_records_2) * safe_float(self.odd2_field.value), (safe_float(self.filtered_records) * safe_float(self.odd1_field.value) * safe_float(self.oddx_field.value)* safe_float(self.odd2_field.value))/10):.1f}%)" if filtered_2 is not None else None,
+            f"{filtered_over} ({self.calculate_percentage(safe_float(self.filtered_over), safe_float(self.filtered_records)):.1f}%)" if filtered_over is not None else None,
+            f"{filtered_bts} ({self.calculate_percentage(safe_float(self.filtered_bts), safe_float(self.filtered_records)):.1f}%)" if filtered_bts is not None else None],
             ["ODD 1", 0, 0, 0, 0, 0],
             ["ODD X", 0, 0, 0, 0, 0],
             ["ODD 2", 0, 0, 0, 0, 0],
@@ -337,7 +392,8 @@ class DataViewerApp:
                         ft.Row(
                             [
                                 ft.Container(
-                                    ft.Text(str(cell), size=14, text_align=ft.TextAlign.CENTER),
+                                    ft.Text(str(cell), size=14, text_align=ft.TextAlign.CENTER)
+                                    if cell is not None else self.stat_skeleton(),
                                     expand=1,
                                     alignment=ft.alignment.center
                                 )
@@ -386,8 +442,108 @@ class DataViewerApp:
 
 
     def refresh_data(self, e=None):
-        data = self.get_filtered_data()
-        
+        filters = self.current_filters()
+        with self.render_lock:
+            # Toute réponse d'une génération précédente sera ignorée
+            self.generation += 1
+            generation = self.generation
+        self.live.invalidate()
+        threading.Thread(
+            target=self.load_data,
+            args=(generation, filters, self.current_page),
+            daemon=True
+        ).start()
+
+    def load_data(self, generation, filters, page_index):
+        """Render the page rows as soon as they arrive, then fill each statistic"""
+        # Phase 1 : lignes de la page et pagination
+        data, count, max_id = [], 0, None
+        if not filters["blocked"]:
+            try:
+                max_id = self.fetch_max_id()
+                data, count = self.fetch_page(filters, page_index, max_id)
+            except Exception as e:
+                print(f"Erreur lors de la récupération des données: {e}")
+                with self.render_lock:
+                    if generation == self.generation:
+                        self.show_load_error()
+                return
+
+        with self.render_lock:
+            if generation != self.generation:
+                return
+            self.filtered_records = count
+            for attribute in self.STAT_ATTRIBUTES.values():
+                # Recherche trop courte : aucun comptage à attendre
+                setattr(self, attribute, 0 if filters["blocked"] else None)
+            self.update_data_table(data)
+            self.update_pagination()
+            self.update_stats_card()
+
+        # Phase 2 : statistiques, affichées au fur et à mesure
+        failed = False
+        if not filters["blocked"]:
+            with ThreadPoolExecutor(max_workers=len(self.STAT_ATTRIBUTES)) as executor:
+                futures = {
+                    executor.submit(self.count_filtered, stat, filters, max_id): stat
+                    for stat in self.STAT_ATTRIBUTES
+                }
+                for future in as_completed(futures):
+                    stat = futures[future]
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        # La cellule reste en squelette jusqu'au rechargement
+                        print(f"Erreur lors du comptage {stat}: {e}")
+                        failed = True
+                        continue
+                    with self.render_lock:
+                        if generation != self.generation:
+                            return
+                        setattr(self, self.STAT_ATTRIBUTES[stat], value)
+                        self.update_stats_card()
+
+        with self.render_lock:
+            if generation != self.generation:
+                return
+            if failed:
+                # Comptages incomplets : les évènements restent en attente jusqu'au rechargement
+                self.schedule_live_refresh()
+                return
+            # Repartir des valeurs du serveur, puis rejouer les évènements reçus entre-temps
+            changes = self.live.reset(
+                filters,
+                self.filtered_records,
+                {stat: getattr(self, attribute) for stat, attribute in self.STAT_ATTRIBUTES.items()},
+                page_index=page_index,
+                rows=data,
+                total_records=self.total_records,
+                max_id=max_id,
+            )
+            self.render_live_changes(changes)
+
+    def show_load_error(self):
+        """Empty the table and say so, then retry the load (called under render_lock)"""
+        self.filtered_records = 0
+        for attribute in self.STAT_ATTRIBUTES.values():
+            setattr(self, attribute, 0)
+        self.update_data_table([])
+        self.update_pagination()
+        self.stats_card.content = ft.Container(
+            content=ft.Text(
+                f"Loading failed, retrying in {self.live_refresh_delay} s...",
+                size=16,
+                color=ft.colors.RED,
+                text_align=ft.TextAlign.CENTER
+            ),
+            padding=ft.padding.all(10),
+            alignment=ft.alignment.center
+        )
+        self.page.update()
+        # Les évènements restent en attente jusqu'au prochain chargement réussi
+        self.schedule_live_refresh()
+
+    def update_data_table(self, data):
         # Création des lignes du tableau avec la colonne RESULT ajoutée
         self.data_table.rows = [
             ft.DataRow(
@@ -403,11 +559,8 @@ class DataViewerApp:
                 ]
             ) for item in data
         ]
-        
-        # Mise à jour des statistiques
-        self.update_stats_card()
-        
-        # Mise à jour de la pagination
+
+    def update_pagination(self):
         current_range_start = self.current_page * self.page_size + 1
         current_range_end = min((self.current_page + 1) * self.page_size, self.filtered_records)
         
@@ -438,30 +591,166 @@ class DataViewerApp:
                 disabled=(self.current_page + 1) * self.page_size >= self.filtered_records
             ),
         ]
-        
-        self.page.update()
+
+    def show_page(self):
+        """Afficher la page courante depuis le cache tenu à jour par le flux, sinon la recharger"""
+        with self.render_lock:
+            with self.live.lock:
+                feed_alive = self.feed is not None and self.feed.is_alive()
+                rows = self.live.pages.get(self.current_page) if feed_alive and self.live.ready else None
+                if rows is not None:
+                    rows = list(rows)
+            if rows is not None:
+                self.update_data_table(rows)
+                self.update_pagination()
+                self.page.update()
+                return
+        self.refresh_data()
 
     def first_page(self, e):
         self.current_page = 0
-        self.refresh_data()
+        self.show_page()
 
     def last_page(self, e):
         self.current_page = (self.filtered_records - 1) // self.page_size
-        self.refresh_data()
+        self.show_page()
 
     def next_page(self, e):
         self.current_page += 1
-        self.refresh_data()
+        self.show_page()
 
     def prev_page(self, e):
         if self.current_page > 0:
             self.current_page -= 1
-            self.refresh_data()
+            self.show_page()
 
     def search_data(self, e):
         self.current_page = 0
         self.refresh_data()
 
+    def start_live_updates(self, feed):
+        """Subscribe to a change feed (Supabase realtime or a local publisher)"""
+        self.feed = feed
+        feed.subscribe(self.on_change_event)
+        feed.start()
+
+    def on_change_event(self, event):
+        with self.render_lock:
+            self.render_live_changes(self.live.apply(event))
+
+    def render_live_changes(self, changes):
+        """Reporter à l'écran les changements appliqués par le flux (appelé sous render_lock)"""
+        if not changes:
+            return
+        with self.live.lock:
+            self.total_records = self.live.total_records
+            self.filtered_records = self.live.filtered_records
+            for stat, attribute in self.STAT_ATTRIBUTES.items():
+                setattr(self, attribute, self.live.counts[stat])
+            leagues = set(self.live.leagues)
+            rows = self.live.pages.get(self.current_page)
+            rows = list(rows) if rows is not None else None
+
+        if "refresh" in changes or ("rows" in changes and rows is None):
+            self.schedule_live_refresh()
+            return
+
+        if "leagues" in changes:
+            known = {option.key or option.text for option in self.filter_dropdown.options}
+            for league in sorted(leagues - known):
+                self.filter_dropdown.options.append(ft.dropdown.Option(league))
+        if "rows" in changes:
+            self.update_data_table(rows)
+        if "stats" in changes:
+            self.update_pagination()
+        # update_stats_card rafraîchit aussi la page
+        self.update_stats_card()
+
+    def schedule_live_refresh(self):
+        # Impossible de rester exact : recharger après une courte pause
+        if self.live_refresh_timer:
+            self.live_refresh_timer.cancel()
+        self.live_refresh_timer = threading.Timer(self.live_refresh_delay, self.refresh_data)
+        self.live_refresh_timer.start()
+
+    def load_fixtures(self, day):
+        """Matches of the given day without a result yet, i.e. the fixtures to score"""
+        def query_func():
+            return (
+                self.supabase.table(TABLE_NAME).select("*")
+                .eq('DATE', day)
+                .is_('RESULT', 'null')
+                .order('ID', desc=True)
+                .range(0, self.max_fixtures - 1)
+                .execute()
+            )
+        try:
+            return self.execute_with_retry(query_func).data
+        except Exception as e:
+            print(f"Error retrieving fixtures: {e}")
+            return []
+
+    def get_prediction_service(self):
+        """Frequency tables for the current history, or None while it is still loading"""
+        # Sous le verrou : la synchronisation ne peut pas fermer l'historique pendant la construction
+        with self.snapshot_lock:
+            if self.history is None:
+                return None
+            # Reconstruire les tables seulement si l'historique a changé
+            if self.prediction_service is None or self.prediction_rows != len(self.history):
+                self.prediction_service = PredictionService.from_snapshot(self.history)
+                self.prediction_rows = len(self.history)
+            return self.prediction_service
+
+    def score_fixtures(self, e=None):
+        # Un clic pendant un calcul en cours est ignoré
+        if not self.scoring_lock.acquire(blocking=False):
+            return
+        try:
+            self.prediction_status.value = "Scoring fixtures..."
+            self.page.update()
+            day = (self.fixture_date_field.value or "").strip() or date.today().strftime(self.fixture_date_format)
+            try:
+                service = self.get_prediction_service()
+                if service is None:
+                    self.prediction_status.value = "History is still loading, try again shortly"
+                    self.page.update()
+                    return
+                scored = service.score(self.load_fixtures(day))
+            except Exception as e:
+                print(f"Error scoring fixtures: {e}")
+                self.prediction_status.value = "Scoring failed"
+                self.page.update()
+                return
+            self.render_predictions(scored, service, day)
+        finally:
+            self.scoring_lock.release()
+
+    def render_predictions(self, scored, service, day):
+        def percent(value):
+            return f"{value * 100:.1f}%" if value is not None else "-"
+
+        self.prediction_table.rows = [
+            ft.DataRow(
+                cells=[
+                    ft.DataCell(ft.Text(f"{item.get('DATE', '')}\n{item.get('H', '')}")),
+                    ft.DataCell(ft.Text(item.get('LEAGUE', ''))),
+                    ft.DataCell(ft.Text(f"{item.get('TEAM1', '')}\n{item.get('TEAM2', '')}")),
+                ] + [
+                    ft.DataCell(ft.Text(
+                        f"{item[column]} | {percent(item['probability'][i])}\n"
+                        f"EV {item['ev'][i] * 100:+.1f}%"
+                    ))
+                    for i, column in enumerate(('ODD1', 'ODDX', 'ODD2'))
+                ] + [
+                    ft.DataCell(ft.Text(str(item['samples']))),
+                    ft.DataCell(ft.Text(item['pick'] or "-", weight=ft.FontWeight.BOLD)),
+                ]
+            ) for item in scored
+        ]
+        self.prediction_status.value = f"{day}: {len(scored)} fixtures scored from {service.samples:,} matches".replace(',', ' ')
+        self.page.update()
+
     def main(self, page: ft.Page):
         self.page = page
         page.title = "BETSMARTER"
@@ -490,10 +779,12 @@ class DataViewerApp:
 
         # Fonction pour changer de page
         def change_page(index):
-             # pageMatches.visible = (index == 0)
-             # pageAnalytics.visible = (index == 1)
-             # pagePrediction.visible = (index == 2)
+            main_container.visible = (index != 2)
+            # pageAnalytics.visible = (index == 1)
+            prediction_container.visible = (index == 2)
             page.update()
+            if index == 2 and not self.prediction_table.rows:
+                threading.Thread(target=self.score_fixtures, daemon=True).start()
 #####################################  AppBar  #####################################
 
         page.appbar = ft.AppBar(
@@ -717,11 +1008,84 @@ class DataViewerApp:
             padding=10,
         )
 
-        page.add(main_container)
+        # Onglet Prediction
+        self.prediction_status = ft.Text("", size=14)
+        self.fixture_date_field = ft.TextField(
+            label="Date",
+            value=date.today().strftime(self.fixture_date_format),
+            width=140
+        )
+        self.prediction_table = ft.DataTable(
+            columns=[
+                ft.DataColumn(ft.Text("Time")),
+                ft.DataColumn(ft.Text("League")),
+                ft.DataColumn(ft.Text("Teams")),
+                ft.DataColumn(ft.Text("1")),
+                ft.DataColumn(ft.Text("X")),
+                ft.DataColumn(ft.Text("2")),
+                ft.DataColumn(ft.Text("Games")),
+                ft.DataColumn(ft.Text("Pick")),
+            ],
+            rows=[],
+        )
+        prediction_container = ft.Container(
+            content=ft.Column(
+                [
+                    ft.Row(
+                        [
+                            self.fixture_date_field,
+                            ft.ElevatedButton(
+                                "Score fixtures",
+                                icon=ft.icons.REFRESH,
+                                on_click=lambda e: threading.Thread(target=self.score_fixtures, daemon=True).start()
+                            ),
+                            self.prediction_status,
+                        ],
+                        spacing=20
+                    ),
+                    ft.Container(
+                        content=ft.Column(
+                            [self.prediction_table],
+                            scroll=ft.ScrollMode.AUTO,
+                            horizontal_alignment=ft.CrossAxisAlignment.STRETCH,
+                        ),
+                        border=ft.border.all(1, ft.colors.BLACK12),
+                        border_radius=8,
+                        expand=True,
+                    ),
+                ],
+                spacing=10,
+                expand=True,
+            ),
+            expand=True,
+            padding=10,
+            visible=False,
+        )
+
+        page.add(main_container, prediction_container)
         
         # Chargement initial
         self.refresh_data()
 
+        # Historique local, synchronisé en arrière-plan (tables de l'onglet Prediction)
+        threading.Thread(
+            target=self.run_snapshot_sync,
+            args=(self.snapshot_path or self.default_snapshot_path,),
+            daemon=True
+        ).start()
+
+        # Mises à jour en direct
+        if self.replay_path:
+            self.start_live_updates(ReplayFeed(self.replay_path))
+        else:
+            self.start_live_updates(SupabaseRealtimeFeed(SUPABASE_CONFIG["url"], SUPABASE_CONFIG["key"], TABLE_NAME))
+
 if __name__ == '__main__':
     app = DataViewerApp()
+    # python main.py --replay stream.jsonl : rejouer un flux enregistré au lieu de Supabase realtime
+    if "--replay" in sys.argv:
+        app.replay_path = sys.argv[sys.argv.index("--replay") + 1]
+    # python main.py --snapshot history.snap : garder l'historique dans un fichier local
+    if "--snapshot" in sys.argv:
+        app.snapshot_path = sys.argv[sys.argv.index("--snapshot") + 1]
     ft.app(target=app.main)
\ No newline at end of file
@@ -0,0 +1,144 @@
+import math
+from array import array
+
+OUTCOMES = ('1', 'X', '2')
+
+
+def implied_probabilities(odd1, oddx, odd2):
+    """Margin-removed implied probabilities (proportional method)"""
+    inverses = [1 / odd1, 1 / oddx, 1 / odd2]
+    booksum = sum(inverses)
+    return [inverse / booksum for inverse in inverses]
+
+
+def _valid_odd(value):
+    try:
+        odd = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(odd) or odd <= 1:
+        return None
+    return odd
+
+
+class PredictionService:
+    """Score fixtures from precomputed 1/X/2 frequency tables over quantized odds.
+
+    Historical matches are counted in a grid of log-scale buckets over
+    (ODD1, ODD2). For each radius a windowed sum of that grid is
+    precomputed, so scoring a fixture is a couple of array reads: the
+    smallest window with at least min_samples matches is used.
+    """
+
+    def __init__(self, step=0.05, max_odd=50.0, min_samples=30, prior_strength=20, radii=(0, 1, 2)):
+        self.step = step  # largeur d'un bucket en log(cote), ~5 %
+        self.size = int(round(math.log(max_odd) / step)) + 1
+        self.min_samples = min_samples
+        self.prior_strength = prior_strength
+        self.radii = radii
+        self.samples = 0
+        self.counts = [array('I', bytes(4 * self.size * self.size)) for _ in OUTCOMES]
+        self.tables = {}
+
+    def bucket(self, odd):
+        return min(int(round(math.log(odd) / self.step)), self.size - 1)
+
+    def add(self, odd1, odd2, result):
+        odd1 = _valid_odd(odd1)
+        odd2 = _valid_odd(odd2)
+        if odd1 is None or odd2 is None or result not in OUTCOMES:
+            return
+        cell = self.bucket(odd1) * self.size + self.bucket(odd2)
+        self.counts[OUTCOMES.index(result)][cell] += 1
+        self.samples += 1
+
+    def build(self):
+        """Precompute the windowed tables for every radius"""
+        size = self.size
+        self.tables = {}
+        for radius in self.radii:
+            tables = []
+            for counts in self.counts:
+                # Somme préfixe 2D, puis somme sur la fenêtre (2r+1)²
+                prefix = array('Q', bytes(8 * (size + 1) * (size + 1)))
+                for i in range(size):
+                    row_sum = 0
+                    for j in range(size):
+                        row_sum += counts[i * size + j]
+                        prefix[(i + 1) * (size + 1) + j + 1] = prefix[i * (size + 1) + j + 1] + row_sum
+                table = array('I', bytes(4 * size * size))
+                for i in range(size):
+                    top, bottom = max(i - radius, 0), min(i + radius + 1, size)
+                    for j in range(size):
+                        left, right = max(j - radius, 0), min(j + radius + 1, size)
+                        table[i * size + j] = (
+                            prefix[bottom * (size + 1) + right]
+                            - prefix[top * (size + 1) + right]
+                            - prefix[bottom * (size + 1) + left]
+                            + prefix[top * (size + 1) + left]
+                        )
+                tables.append(table)
+            self.tables[radius] = tables
+        return self
+
+    @classmethod
+    def from_rows(cls, rows, **kwargs):
+        service = cls(**kwargs)
+        for row in rows:
+            service.add(row.get('ODD1'), row.get('ODD2'), row.get('RESULT'))
+        return service.build()
+
+    @classmethod
+    def from_snapshot(cls, snapshot, **kwargs):
+        """Build the tables straight from the snapshot columns (no row decoding)"""
+        service = cls(**kwargs)
+        results = snapshot.tables['result']
+        for count, views in snapshot.segments:
+            odds1, odds2, codes = views['ODD1'], views['ODD2'], views['RESULT']
+            for index in range(count):
+                code = codes[index]
+                if code < len(results):
+                    service.add(odds1[index], odds2[index], results[code])
+        return service.build()
+
+    def frequencies(self, odd1, odd2):
+        """Return ([n1, nX, n2], radius) for the smallest window with enough samples"""
+        cell = self.bucket(odd1) * self.size + self.bucket(odd2)
+        counts, radius = [0, 0, 0], None
+        for radius in self.radii:
+            counts = [table[cell] for table in self.tables[radius]]
+            if sum(counts) >= self.min_samples:
+                break
+        return counts, radius
+
+    def score(self, fixtures):
+        """Score a batch of fixtures; fixtures without three valid odds are skipped"""
+        scored = []
+        for fixture in fixtures:
+            odds = [_valid_odd(fixture.get(column)) for column in ('ODD1', 'ODDX', 'ODD2')]
+            if None in odds:
+                continue
+            implied = implied_probabilities(*odds)
+            counts, radius = self.frequencies(odds[0], odds[2])
+            samples = sum(counts)
+            empirical = [count / samples for count in counts] if samples else [None, None, None]
+
+            # Fréquences observées, tirées vers les probabilités implicites quand l'échantillon est petit
+            probability = [
+                (count + self.prior_strength * prior) / (samples + self.prior_strength)
+                for count, prior in zip(counts, implied)
+            ]
+            ev = [p * odd - 1 for p, odd in zip(probability, odds)]
+            best = max(range(3), key=lambda i: ev[i])
+
+            scored.append(dict(
+                fixture,
+                samples=samples,
+                radius=radius,
+                empirical=empirical,
+                implied=implied,
+                probability=probability,
+                ev=ev,
+                pick=OUTCOMES[best] if ev[best] > 0 else None,
+            ))
+        return scored
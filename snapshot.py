@@ -0,0 +1,449 @@
+import math
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+
+# Fichier : en-tête fixe, puis une suite de segments ajoutés les uns après les autres.
+# Chaque segment contient les nouvelles entrées des tables de chaînes, puis une
+# colonne de largeur fixe par champ (petit-boutiste). En-têtes et blocs ont une
+# taille multiple de 8, donc chaque colonne commence à un offset du fichier aligné sur 8.
+# Version 2 : en-tête de segment porté à 24 octets pour cet alignement.
+MAGIC = b"BSMSNAP\0"
+VERSION = 2
+HEADER = struct.Struct("<8sHHIQQ")  # magic, version, colonnes, segments, lignes, fin des données
+HEADER_SIZE = 64
+SEGMENT_MAGIC = b"SEG1"
+SEGMENT_HEADER = struct.Struct("<4sIQI4x")  # magic, lignes, taille des données, crc32, bourrage
+
+# Colonne -> format array ("q" entier 64 bits, "d" flottant, "h" entier 16 bits,
+# "I" code dans une table de chaînes)
+COLUMNS = (
+    ('ID', 'q'),
+    ('DATE', 'I'),
+    ('H', 'I'),
+    ('LEAGUE', 'I'),
+    ('TEAM1', 'I'),
+    ('TEAM2', 'I'),
+    ('ODD1', 'd'),
+    ('ODDX', 'd'),
+    ('ODD2', 'd'),
+    ('RESULT', 'I'),
+    ('GOAL1', 'h'),
+    ('GOAL2', 'h'),
+)
+# Colonne de chaînes -> table partagée (TEAM1 et TEAM2 utilisent la même)
+STRING_TABLES = {
+    'DATE': 'date',
+    'H': 'hour',
+    'LEAGUE': 'league',
+    'TEAM1': 'team',
+    'TEAM2': 'team',
+    'RESULT': 'result',
+}
+TABLE_NAMES = ('date', 'hour', 'league', 'team', 'result')
+NULL_CODE = 0xFFFFFFFF
+NULL_GOAL = -1
+
+
+class SnapshotError(Exception):
+    """Raised for a missing, corrupted or incompatible snapshot file"""
+
+
+def _padding(size):
+    return -size % 8
+
+
+def _pack_header(segment_count, row_count, data_end):
+    fields = HEADER.pack(MAGIC, VERSION, len(COLUMNS), segment_count, row_count, data_end)
+    header = fields + struct.pack("<I", zlib.crc32(fields))
+    return header + b"\0" * (HEADER_SIZE - len(header))
+
+
+def _unpack_header(data):
+    if len(data) < HEADER_SIZE or data[:len(MAGIC)] != MAGIC:
+        raise SnapshotError("Not a match history snapshot")
+    fields = bytes(data[:HEADER.size])
+    magic, version, column_count, segment_count, row_count, data_end = HEADER.unpack(fields)
+    if version != VERSION or column_count != len(COLUMNS):
+        # Format incompatible : le fichier doit être reconstruit
+        raise SnapshotError(f"Unsupported snapshot version {version} (expected {VERSION})")
+    (checksum,) = struct.unpack_from("<I", data, HEADER.size)
+    if checksum != zlib.crc32(fields):
+        raise SnapshotError("Snapshot header checksum mismatch")
+    return segment_count, row_count, data_end
+
+
+def _column_view(buffer, typecode):
+    if sys.byteorder == 'little':
+        return buffer.cast(typecode)
+    # Machine gros-boutiste : copie convertie
+    values = array(typecode, bytes(buffer))
+    values.byteswap()
+    return values
+
+
+class Column:
+    """Read-only view of one column across every segment of a snapshot"""
+
+    def __init__(self, parts, table=None):
+        self.parts = parts  # [(vue, nombre de lignes)]
+        self.table = table
+        self.starts = []
+        total = 0
+        for _, count in parts:
+            self.starts.append(total)
+            total += count
+        self.length = total
+
+    def __len__(self):
+        return self.length
+
+    def raw(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("snapshot column index out of range")
+        part = bisect_right(self.starts, index) - 1
+        return self.parts[part][0][index - self.starts[part]]
+
+    def decode(self, value):
+        if self.table is not None:
+            return self.table[value] if value != NULL_CODE else None
+        if isinstance(value, float) and math.isnan(value):
+            return None
+        if value == NULL_GOAL and not isinstance(value, float):
+            return None
+        return value
+
+    def __getitem__(self, index):
+        return self.decode(self.raw(index))
+
+    def __iter__(self):
+        for view, _ in self.parts:
+            for value in view:
+                yield self.decode(value)
+
+
+class Snapshot:
+    """Memory-mapped, column-oriented snapshot of the match history.
+
+    Opening only reads the header and the string tables; column pages are
+    loaded lazily by the OS and shared between processes through the page cache.
+    """
+
+    def __init__(self, path, verify=False):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise SnapshotError("Empty snapshot file")
+        self.buffer = memoryview(self.map)
+        self.views = []
+        try:
+            self.segment_count, self.row_count, self.data_end = _unpack_header(self.buffer)
+            if self.data_end > len(self.map):
+                raise SnapshotError("Truncated snapshot file")
+            self.tables = {name: [] for name in TABLE_NAMES}
+            self.segments = []  # [(lignes, {colonne: vue})]
+            try:
+                self.read_segments(verify)
+            except (struct.error, UnicodeDecodeError, TypeError, ValueError) as e:
+                # Fichier corrompu ouvert sans vérification des sommes de contrôle
+                raise SnapshotError(f"Corrupted snapshot: {e}") from None
+        except Exception:
+            self.close()
+            raise
+        self.columns = {}
+
+    def read_segments(self, verify):
+        offset = HEADER_SIZE
+        rows = 0
+        for _ in range(self.segment_count):
+            if offset + SEGMENT_HEADER.size > self.data_end:
+                raise SnapshotError("Truncated snapshot segment")
+            magic, count, size, checksum = SEGMENT_HEADER.unpack_from(self.buffer, offset)
+            if magic != SEGMENT_MAGIC:
+                raise SnapshotError(f"Bad segment marker at offset {offset}")
+            start = offset + SEGMENT_HEADER.size
+            end = start + size
+            if end > self.data_end:
+                raise SnapshotError("Truncated snapshot segment")
+            if verify and zlib.crc32(self.buffer[start:end]) != checksum:
+                raise SnapshotError(f"Segment checksum mismatch at offset {offset}")
+
+            # Nouvelles entrées des tables de chaînes
+            position = start
+            for name in TABLE_NAMES:
+                (entries,) = struct.unpack_from("<I", self.buffer, position)
+                position += 4
+                table = self.tables[name]
+                for _ in range(entries):
+                    if position >= end:
+                        raise SnapshotError(f"Corrupted string table at offset {offset}")
+                    (length,) = struct.unpack_from("<H", self.buffer, position)
+                    position += 2
+                    table.append(bytes(self.buffer[position:position + length]).decode('utf-8'))
+                    position += length
+            position += _padding(position - start)
+
+            views = {}
+            for name, typecode in COLUMNS:
+                width = count * array(typecode).itemsize
+                if position + width > end:
+                    raise SnapshotError(f"Corrupted column {name} at offset {offset}")
+                view = _column_view(self.buffer[position:position + width], typecode)
+                self.views.append(view)
+                views[name] = view
+                position += width + _padding(width)
+            if position != end:
+                raise SnapshotError(f"Inconsistent segment size at offset {offset}")
+            self.segments.append((count, views))
+            rows += count
+            offset = end
+        if rows != self.row_count or offset != self.data_end:
+            raise SnapshotError("Snapshot header does not match its segments")
+
+    def __len__(self):
+        return self.row_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def column(self, name):
+        if name not in self.columns:
+            table = self.tables[STRING_TABLES[name]] if name in STRING_TABLES else None
+            parts = [(views[name], count) for count, views in self.segments]
+            self.columns[name] = Column(parts, table)
+        return self.columns[name]
+
+    def row(self, index):
+        return {name: self.column(name)[index] for name, _ in COLUMNS}
+
+    def rows(self, start=0, stop=None):
+        stop = self.row_count if stop is None else min(stop, self.row_count)
+        for index in range(start, stop):
+            yield self.row(index)
+
+    def max_id(self):
+        ids = self.column('ID')
+        return max((max(view) for view, count in ids.parts if count), default=0)
+
+    def close(self):
+        for view in getattr(self, 'views', []):
+            if isinstance(view, memoryview):
+                view.release()
+        self.views = []
+        self.columns = {}
+        if getattr(self, 'buffer', None) is not None:
+            self.buffer.release()
+            self.buffer = None
+        if getattr(self, 'map', None) is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock shared by every writer of a snapshot, across processes"""
+    with open(f"{path}.lock", 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK abandonne après ~10 s : on réessaie
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _encode_float(value):
+    if value is None or value == '':
+        return math.nan
+    return float(value)
+
+
+def _encode_goal(value):
+    if value is None or value == '':
+        return NULL_GOAL
+    goal = float(value)
+    if not goal.is_integer() or not 0 <= goal <= 32767:
+        raise ValueError(f"not a goal count: {value!r}")
+    return int(goal)
+
+
+class SnapshotWriter:
+    """Append rows to a snapshot file, creating it if needed.
+
+    Every append holds an exclusive file lock and re-reads the header and
+    string tables under it, so several writers (threads or processes) can
+    share one file. Each append writes a new segment after the existing
+    data and only then rewrites the header, so an interrupted append
+    leaves the previous snapshot readable.
+    """
+
+    def __init__(self, path, verify=True):
+        self.path = path
+        with _file_lock(path):
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                Snapshot(path, verify=verify).close()
+            else:
+                _write_empty(path)
+
+    @classmethod
+    def create(cls, path):
+        """Replace the file with an empty snapshot (e.g. after a version change).
+
+        The new file is swapped in with os.replace, so processes that still
+        map the old file keep reading it instead of crashing on a truncation.
+        """
+        with _file_lock(path):
+            _write_empty(path)
+        return cls(path, verify=False)
+
+    def encode_row(self, row, codes, new_entries):
+        """Encode one row; its new strings are only recorded once the whole row is valid"""
+        values = []
+        row_entries = {}
+        for name, typecode in COLUMNS:
+            value = row.get(name)
+            try:
+                if name in STRING_TABLES:
+                    table = STRING_TABLES[name]
+                    if value is None:
+                        value = NULL_CODE
+                    else:
+                        value = str(value)
+                        if len(value.encode('utf-8')) > 0xFFFF:
+                            raise ValueError("string longer than 65535 bytes")
+                        if value in codes[table]:
+                            value = codes[table][value]
+                        else:
+                            pending = row_entries.setdefault(table, [])
+                            if value not in pending:
+                                pending.append(value)
+                            value = len(codes[table]) + pending.index(value)
+                elif typecode == 'd':
+                    value = _encode_float(value)
+                elif typecode == 'h':
+                    value = _encode_goal(value)
+                else:
+                    value = int(value)
+                    if not -2 ** 63 <= value < 2 ** 63:
+                        raise OverflowError("ID out of range")
+            except (TypeError, ValueError, OverflowError) as e:
+                raise ValueError(f"Invalid {name} for row ID {row.get('ID')!r}: {e}") from None
+            values.append(value)
+
+        for table, entries in row_entries.items():
+            for value in entries:
+                codes[table][value] = len(codes[table])
+                new_entries[table].append(value)
+        return values
+
+    def encode(self, rows, codes):
+        """Encode rows into a segment payload; invalid rows are reported and left out.
+
+        Returns (payload, number of rows encoded).
+        """
+        new_entries = {name: [] for name in TABLE_NAMES}
+        columns = {name: array(typecode) for name, typecode in COLUMNS}
+        encoded_rows = 0
+        for row in rows:
+            try:
+                values = self.encode_row(row, codes, new_entries)
+            except ValueError as e:
+                print(f"Skipping snapshot row: {e}")
+                continue
+            for (name, _), value in zip(COLUMNS, values):
+                columns[name].append(value)
+            encoded_rows += 1
+
+        payload = bytearray()
+        for name in TABLE_NAMES:
+            payload += struct.pack("<I", len(new_entries[name]))
+            for value in new_entries[name]:
+                encoded = value.encode('utf-8')
+                payload += struct.pack("<H", len(encoded)) + encoded
+        payload += b"\0" * _padding(len(payload))
+        for name, _ in COLUMNS:
+            values = columns[name]
+            if sys.byteorder != 'little':
+                values.byteswap()
+            data = values.tobytes()
+            payload += data + b"\0" * _padding(len(data))
+        return payload, encoded_rows
+
+    def append(self, rows):
+        """Write rows as a new segment; returns the number of rows appended.
+
+        Rows that cannot be encoded are skipped (and reported), so one bad
+        row never blocks the rest of the history.
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+
+        with _file_lock(self.path):
+            # État actuel du fichier, relu sous le verrou
+            with Snapshot(self.path) as snapshot:
+                codes = {
+                    name: {value: code for code, value in enumerate(snapshot.tables[name])}
+                    for name in TABLE_NAMES
+                }
+                segment_count = snapshot.segment_count
+                row_count = snapshot.row_count
+                data_end = snapshot.data_end
+
+            payload, count = self.encode(rows, codes)
+            if not count:
+                return 0
+            segment = SEGMENT_HEADER.pack(SEGMENT_MAGIC, count, len(payload), zlib.crc32(payload))
+            with open(self.path, 'r+b') as f:
+                f.seek(data_end)
+                f.write(segment)
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+
+                # L'en-tête n'est mis à jour qu'une fois le segment écrit
+                f.seek(0)
+                f.write(_pack_header(segment_count + 1, row_count + count,
+                                     data_end + len(segment) + len(payload)))
+                f.flush()
+                os.fsync(f.fileno())
+        return count
+
+
+def _write_empty(path):
+    """Atomically replace path with an empty snapshot (caller holds the lock)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_pack_header(0, 0, HEADER_SIZE))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)